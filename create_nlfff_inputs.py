@@ -7,6 +7,7 @@ Usage:
 """
 
 import argparse
+import re
 import sys
 import os
 
@@ -15,6 +16,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from pynlfff.pyprepare.prepare_base import PrepareWorker
 
+# grid.ini format: nx\n\t###\nny\n\t###\nnz\n\t###\nmu..., the first three numbers are nx, ny, nz
+GRID_RE = re.compile(rb'(\d+)')
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -103,10 +107,12 @@ Output files (written to --output directory):
         "boundary.ini"
     ]
     
+    # one directory read instead of an exists/getsize stat pair per file
+    entries = {e.name: e for e in os.scandir(args.output)}
+    
     for fname in expected_files:
-        fpath = os.path.join(args.output, fname)
-        if os.path.exists(fpath):
-            size_kb = os.path.getsize(fpath) / 1024
+        if fname in entries:
+            size_kb = entries[fname].stat().st_size / 1024
             print(f"  ✓ {fname:25s} ({size_kb:8.1f} KB)")
         else:
             print(f"  ✗ {fname:25s} (missing!)")
@@ -115,17 +121,14 @@ Output files (written to --output directory):
     grid_info = []
     for level in [1, 2, 3]:
         grid_file = os.path.join(args.output, f"grid{level}.ini")
-        if os.path.exists(grid_file):
-            with open(grid_file, 'r') as f:
-                lines = f.read().strip().split('\n')
-                # Format: nx\n\t###\nny\n\t###\nnz\n\t###
-                try:
-                    nx = int(lines[1].strip())
-                    ny = int(lines[3].strip())
-                    nz = int(lines[5].strip())
-                    grid_info.append((level, nx, ny, nz))
-                except:
-                    pass
+        if f"grid{level}.ini" in entries:
+            with open(grid_file, 'rb') as f:
+                nums = GRID_RE.findall(f.read())
+            if len(nums) >= 3:
+                nx, ny, nz = map(int, nums[:3])
+                grid_info.append((level, nx, ny, nz))
+            else:
+                print(f"  Warning: cannot read nx, ny, nz from {grid_file}", file=sys.stderr)
     
     if grid_info:
         print()
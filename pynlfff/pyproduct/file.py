@@ -97,11 +97,13 @@ class NlfffFile():
         endian = self.endian
         np_dtype_str = "{}{}".format(endian, float_format)  # like little '<d'
         with open(bin_path, "rb") as f:
+            if hasattr(os, "posix_fadvise"):  # linux, the whole file is read front to back once
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
             pic = np.fromfile(
                 f,  # which is open
                 dtype=np.dtype(np_dtype_str),
                 # np_dtype_str eg '<d' little https://numpy.org/doc/stable/reference/arrays.dtypes.html
-                count=-1,  # all data
+                count=3 * nx * ny * nz,  # only the field, check_bin_size_with_grid allows some tail bytes
                 sep='',  # Binary without spacing
                 offset=0
                 # The offset from the beginning is 0, note that this is the first operation after opening the file
@@ -109,6 +111,8 @@ class NlfffFile():
                 (3, nx, ny, nz),  # 3*nx*ny*nz
                 order='C'  # According to the C language order reshape, that is, the last (nz) changes the fastest
             )
+            if hasattr(os, "posix_fadvise"):  # data is copied into pic, page cache of the bin is not needed
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
         # time.sleep(100)
         return pic
 
@@ -127,6 +131,7 @@ class NlfffFile():
         np_dtype_str = "{}{}".format(endian, float_format)  # eg '<d'
         pic = np.memmap(bin_path,
                         dtype=np.dtype(np_dtype_str),
+                        mode='r',  # read only, default 'r+' would map the file writable
                         offset=0,
                         shape=(3, nx, ny, nz),
                         order='C')  # https://numpy.org/doc/stable/reference/generated/numpy.memmap.html
@@ -143,6 +148,7 @@ class NlfffFile():
         :param nz: the int value of nz
         :param memmap: True or False,default True, True use np.memmap
         :return: numpy array shape like (3,nx,ny,nz) ,or size is not ok return False
+                bin is written Bx, By, Bz one after another, so each result[i] is a C contiguous plane
         """
         result = False
         if isinstance(grid_path,str) and os.path.exists(grid_path):
@@ -160,6 +166,27 @@ class NlfffFile():
                 result = self.__bin2array_with_nxyz_oneload_alldata_nomap(nxyz[0], nxyz[1], nxyz[2], bin_path)
         return result
     
+    def release_bin_cache(self, bin_path):
+        """
+        tell the os the page cache of a bin read by read_bin(memmap=True) can be dropped,
+        so a GB sized bin read once does not push other data out of memory
+        call after the memmap array and all its views are deleted, mapped pages are kept
+        :param bin_path: the path of Bout.bin or B0.bin, or its os.DirEntry from os.scandir
+        :return: True if the hint was given, False if not supported (not linux) or file not exists
+        """
+        result = False
+        if hasattr(os, "posix_fadvise"):
+            try:
+                fd = os.open(bin_path, os.O_RDONLY)
+            except FileNotFoundError:
+                return result
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                result = True
+            finally:
+                os.close(fd)
+        return result
+
     def read_bin2(self,head_fileName=None,bout_fileName=None,bout_dir=None):
         if bout_dir is not None:
             head_fileName=os.path.join(bout_dir,'grid3.ini')
@@ -3,49 +3,514 @@
 Example script to read and analyze NLFFF results.
 
 Usage:
-    python read_results_example.py /path/to/project_dir
+    python read_results_example.py /path/to/project_dir [--force-recompute]
 """
 
+import argparse
 import sys
 import os
+import math
+import re
 import numpy as np
 
+try:
+    from numba import njit, prange, float64, types
+except ImportError:  # numba not installed, cwsin_kernel/all_stats below fall back to numpy
+    njit = None
+
+try:
+    from numba import cuda
+except ImportError:  # numba not installed or without the cuda target
+    cuda = None
+
 # Add pynlfff to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from pynlfff.pyproduct.file import NlfffFile
 
+# x-planes per slab, bin files are C order (3,nx,ny,nz) so an x-slab is one
+# contiguous block of the file and a memmap only needs that block resident
+TILE = 32
+# "key: value" lines of NLFFFquality.log, key is text before the first ':'
+QUALITY_RE = re.compile(r'^[ \t]*([^:\n]*?)[ \t]*:[ \t]*(.*?)[ \t\r]*$', re.M)
+# " Sigma_J 0.1234 , Angle(B,J) = 7.1234 Degree", once per region
+QUALITY_SIGMA_RE = re.compile(r'Sigma_J\s+(\S+)\s*,\s*Angle\(B,J\)\s*=\s*(\S+)\s*Degree')
+# threads per block edge for cwsin_gpu, one thread per interior voxel
+GPU_BLOCK = 8
+
+
+def _tryfloat(val):
+    """float(val) if val is a number, otherwise val unchanged"""
+    try:
+        return float(val)
+    except ValueError:
+        return val
+
+
+def read_quality_sigma(logfile):
+    """
+    Sigma_J and Angle(B,J) lines of NLFFFquality.log, as written by checkquality
+    :param logfile: the path of NLFFFquality.log, or its os.DirEntry from os.scandir
+    :return: list of (sigma_j, angle) full box first then inner region, up to the first pair
+        that is not numbers, or None if file not exists
+    """
+    try:  # no separate exists check, the caller may already have the scandir entry
+        with open(logfile, 'r') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    # stop at the first pair that is not numbers (e.g. 1.#QNAN), so an unreadable log falls
+    # back to the Bout.bin estimate instead of stopping the analysis, and an inner region
+    # value is never taken for the full box one
+    pairs = []
+    for sigma_j, angle in QUALITY_SIGMA_RE.findall(text):
+        pair = (_tryfloat(sigma_j), _tryfloat(angle))
+        if not all(isinstance(val, float) for val in pair):
+            break
+        pairs.append(pair)
+    return pairs
+
 
 def read_quality_log(logfile):
-    """Parse NLFFFquality.log file."""
-    if not os.path.exists(logfile):
+    """Parse NLFFFquality.log file, logfile is a path or an os.DirEntry."""
+    try:
+        with open(logfile, 'r') as f:
+            text = f.read()
+    except FileNotFoundError:
         return None
-    
-    metrics = {}
-    with open(logfile, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if ':' in line:
-                key, val = line.split(':', 1)
-                try:
-                    metrics[key.strip()] = float(val.strip())
-                except:
-                    metrics[key.strip()] = val.strip()
-    return metrics
-
-
-def analyze_field(project_dir):
-    """Analyze NLFFF results from a project directory."""
+    return {key: _tryfloat(val) for key, val in QUALITY_RE.findall(text)}
+
+
+if njit is not None:
+    # concrete signatures for the cpu kernels, read-only C contiguous float64 ('<d' bin) and
+    # float32 ('<f' bin) fields, writable arrays match them too; with cache=True they are
+    # compiled once and later runs load the machine code from __pycache__ (or NUMBA_CACHE_DIR)
+    # without JIT warmup
+    _F8_3D = types.Array(types.float64, 3, 'C', readonly=True)
+    _F4_3D = types.Array(types.float32, 3, 'C', readonly=True)
+    _F8_2D = types.Array(types.float64, 2, 'C', readonly=True)
+    CWSIN_SIGNATURES = [
+        types.UniTuple(types.float64, 2)(_F8_3D, _F8_3D, _F8_3D, _F8_2D),
+        types.UniTuple(types.float64, 2)(_F4_3D, _F4_3D, _F4_3D, _F8_2D),
+    ]
+    ALL_STATS_SIGNATURES = [
+        types.UniTuple(types.float64, 10)(_F8_3D, _F8_3D, _F8_3D),
+        types.UniTuple(types.float64, 10)(_F4_3D, _F4_3D, _F4_3D),
+    ]
+
+
+    # fastmath without 'nnan'/'ninf', a NaN voxel from a diverged run has to reach the sums
+    CWSIN_FASTMATH = {'reassoc', 'nsz', 'arcp', 'contract', 'afn'}
+
+    @njit(CWSIN_SIGNATURES, parallel=True, fastmath=CWSIN_FASTMATH, cache=True)
+    def cwsin_kernel(Bx, By, Bz, mask):
+        """
+        one pass over the interior voxels for the current-weighted sine of angle(J,B)
+        :param Bx: Bx array shape like (nx,ny,nz)
+        :param By: By array shape like (nx,ny,nz)
+        :param Bz: Bz array shape like (nx,ny,nz)
+        :param mask: lower boundary mask shape like (nx,ny), columns where mask is 0 are skipped
+        :return: (num, wsum) sum of |J||B|sin(angle) and sum of |J||B|
+        """
+        nx, ny, nz = Bx.shape
+        zero = Bx.dtype.type(0)
+        num = 0.0
+        wsum = 0.0
+        for i in prange(1, nx - 1):
+            for j in range(1, ny - 1):
+                if mask[i, j] == 0.0:
+                    continue
+                # z row sums in the field's own dtype, so each signature gets an inner loop of
+                # one float width that LLVM packs into simd lanes (mixing f4 terms into the f8
+                # total kept the '<f' loop scalar), rows are then added up in float64
+                row_num = zero
+                row_wsum = zero
+                for k in range(1, nz - 1):
+                    # same centred differences as before, without the 1/(2h) factor
+                    jx = (Bz[i, j + 1, k] - Bz[i, j - 1, k]) - (By[i, j, k + 1] - By[i, j, k - 1])
+                    jy = (Bx[i, j, k + 1] - Bx[i, j, k - 1]) - (Bz[i + 1, j, k] - Bz[i - 1, j, k])
+                    jz = (By[i + 1, j, k] - By[i - 1, j, k]) - (Bx[i, j + 1, k] - Bx[i, j - 1, k])
+                    bx = Bx[i, j, k]
+                    by = By[i, j, k]
+                    bz = Bz[i, j, k]
+                    b2 = bx * bx + by * by + bz * bz
+                    j2 = jx * jx + jy * jy + jz * jz
+                    # |J||B|sin(angle) = |J x B|, no arccos/sin, no division and no clamp
+                    # (a sum of squares is never negative), a zero weight voxel adds 0 to both sums
+                    cx = jy * bz - jz * by
+                    cy = jz * bx - jx * bz
+                    cz = jx * by - jy * bx
+                    row_wsum += np.sqrt(j2 * b2)
+                    row_num += np.sqrt(cx * cx + cy * cy + cz * cz)
+                wsum += row_wsum
+                num += row_num
+        return num, wsum
+
+
+    # fastmath without 'reassoc', the float64 sums below are kept in loop order, and
+    # without 'nnan'/'ninf', a NaN or inf voxel has to show up in the printed ranges
+    SUM_FASTMATH = {'nsz', 'arcp', 'contract', 'afn'}
+
+    @njit(ALL_STATS_SIGNATURES, parallel=True, fastmath=SUM_FASTMATH, cache=True)
+    def all_stats(Bx, By, Bz):
+        """
+        one pass over Bx,By,Bz for the component ranges and the |B| statistics,
+        |B| itself is never stored
+        :param Bx: Bx array shape like (nx,ny,nz)
+        :param By: By array shape like (nx,ny,nz)
+        :param Bz: Bz array shape like (nx,ny,nz)
+        :return: (xmin, xmax, ymin, ymax, zmin, zmax, bmin, bmax, bsum, energy)
+                bsum is sum of |B|, energy is sum of |B|^2
+        """
+        bx = Bx.ravel()
+        by = By.ravel()
+        bz = Bz.ravel()
+        n = bx.size
+        nrow = Bx.shape[0]
+        step = n // nrow
+        # one row of partial results per x plane, combined after the parallel loop
+        part = np.empty((nrow, 10), dtype=np.float64)
+        for r in prange(nrow):
+            xlo = np.inf
+            xhi = -np.inf
+            ylo = np.inf
+            yhi = -np.inf
+            zlo = np.inf
+            zhi = -np.inf
+            lo = np.inf
+            hi = np.float64(0.0)
+            s = np.float64(0.0)
+            e = np.float64(0.0)
+            # builtin min/max skip NaN, so NaN components are flagged here and the
+            # row range set to NaN below (|B| is NaN if any component is)
+            xnan = False
+            ynan = False
+            znan = False
+            for p in range(r * step, (r + 1) * step):
+                # accumulate in float64 even for a '<f' bin, |B|^2 alone reaches ~1e8 per voxel
+                x = np.float64(bx[p])
+                y = np.float64(by[p])
+                z = np.float64(bz[p])
+                xnan |= x != x
+                ynan |= y != y
+                znan |= z != z
+                xlo = min(xlo, x)
+                xhi = max(xhi, x)
+                ylo = min(ylo, y)
+                yhi = max(yhi, y)
+                zlo = min(zlo, z)
+                zhi = max(zhi, z)
+                m = x * x + y * y + z * z
+                b = np.sqrt(m)
+                e += m
+                s += b
+                lo = min(lo, b)
+                hi = max(hi, b)
+            if xnan:
+                xlo = xhi = np.nan
+            if ynan:
+                ylo = yhi = np.nan
+            if znan:
+                zlo = zhi = np.nan
+            if xnan or ynan or znan:
+                lo = hi = np.nan
+            part[r, 0] = xlo
+            part[r, 1] = xhi
+            part[r, 2] = ylo
+            part[r, 3] = yhi
+            part[r, 4] = zlo
+            part[r, 5] = zhi
+            part[r, 6] = lo
+            part[r, 7] = hi
+            part[r, 8] = s
+            part[r, 9] = e
+        # plain serial combine, with parallel=True part[:, q].min() becomes a parfor
+        # reduction that would skip NaN rows again
+        total = part[0].copy()
+        for r in range(1, nrow):
+            for q in range(0, 8, 2):
+                lo = part[r, q]
+                hi = part[r, q + 1]
+                if lo < total[q] or lo != lo:
+                    total[q] = lo
+                if hi > total[q + 1] or hi != hi:
+                    total[q + 1] = hi
+            total[8] += part[r, 8]
+            total[9] += part[r, 9]
+        return (total[0], total[1], total[2], total[3], total[4],
+                total[5], total[6], total[7], total[8], total[9])
+
+else:
+    def cwsin_kernel(Bx, By, Bz, mask):
+        """
+        numpy version of the numba cwsin_kernel, temporaries are the size of one slab
+        :param Bx: Bx array shape like (nx,ny,nz)
+        :param By: By array shape like (nx,ny,nz)
+        :param Bz: Bz array shape like (nx,ny,nz)
+        :param mask: lower boundary mask shape like (nx,ny), columns where mask is 0 are skipped
+        :return: (num, wsum) sum of |J||B|sin(angle) and sum of |J||B|
+        """
+        # ufuncs bound once per slab, the work below is a handful of in place slab ops
+        _sqrt = np.sqrt
+        _sum = np.sum
+        c = (slice(1, -1), slice(1, -1), slice(1, -1))
+        jx = (Bz[1:-1, 2:, 1:-1] - Bz[1:-1, :-2, 1:-1]) - (By[1:-1, 1:-1, 2:] - By[1:-1, 1:-1, :-2])
+        jy = (Bx[1:-1, 1:-1, 2:] - Bx[1:-1, 1:-1, :-2]) - (Bz[2:, 1:-1, 1:-1] - Bz[:-2, 1:-1, 1:-1])
+        jz = (By[2:, 1:-1, 1:-1] - By[:-2, 1:-1, 1:-1]) - (Bx[1:-1, 2:, 1:-1] - Bx[1:-1, :-2, 1:-1])
+        bx, by, bz = Bx[c], By[c], Bz[c]
+        keep = (mask[1:-1, 1:-1] != 0.0)[:, :, np.newaxis]
+        cx = jy * bz
+        cx -= jz * by
+        cy = jz * bx
+        cy -= jx * bz
+        cz = jx * by
+        cz -= jy * bx
+        cross = cx * cx
+        cross += cy * cy
+        cross += cz * cz
+        weight = jx * jx
+        weight += jy * jy
+        weight += jz * jz
+        weight *= bx * bx + by * by + bz * bz
+        num = _sum(_sqrt(cross, out=cross), where=keep, dtype=np.float64)
+        wsum = _sum(_sqrt(weight, out=weight), where=keep, dtype=np.float64)
+        return float(num), float(wsum)
+
+    def all_stats(Bx, By, Bz):
+        """
+        numpy version of the numba all_stats, temporaries are the size of one slab
+        :param Bx: Bx array shape like (nx,ny,nz)
+        :param By: By array shape like (nx,ny,nz)
+        :param Bz: Bz array shape like (nx,ny,nz)
+        :return: (xmin, xmax, ymin, ymax, zmin, zmax, bmin, bmax, bsum, energy)
+                bsum is sum of |B|, energy is sum of |B|^2
+        """
+        _square = np.square
+        m = _square(Bx, dtype=np.float64)
+        m += _square(By, dtype=np.float64)
+        m += _square(Bz, dtype=np.float64)
+        energy = m.sum()
+        b = np.sqrt(m, out=m)
+        return (float(Bx.min()), float(Bx.max()), float(By.min()), float(By.max()),
+                float(Bz.min()), float(Bz.max()),
+                float(b.min()), float(b.max()), float(b.sum()), float(energy))
+
+
+def field_stats(Bx, By, Bz, tile=TILE):
+    """
+    all_stats over x-slabs of tile planes, so a memmap field is streamed slab by slab
+    :param Bx: Bx array shape like (nx,ny,nz)
+    :param By: By array shape like (nx,ny,nz)
+    :param Bz: Bz array shape like (nx,ny,nz)
+    :param tile: planes per slab
+    :return: (xmin, xmax, ymin, ymax, zmin, zmax, bmin, bmax, bmean, energy)
+    """
+    nx = Bx.shape[0]
+    # running min/max at even/odd index of the first 8, then sum of |B| and energy
+    total = [np.inf, -np.inf] * 4 + [0.0, 0.0]
+    for i0 in range(0, nx, tile):
+        sl = slice(i0, min(i0 + tile, nx))
+        part = all_stats(Bx[sl], By[sl], Bz[sl])
+        # np.minimum/np.maximum keep a NaN slab range, builtin min/max would drop it
+        for q in range(0, 8, 2):
+            total[q] = float(np.minimum(total[q], part[q]))
+            total[q + 1] = float(np.maximum(total[q + 1], part[q + 1]))
+        total[8] += part[8]
+        total[9] += part[9]
+    total[8] /= Bx.size
+    return tuple(total)
+
+
+def field_cwsin(Bx, By, Bz, mask, tile=TILE):
+    """
+    cwsin_kernel over x-slabs of tile interior planes plus one halo plane each side
+    :param Bx: Bx array shape like (nx,ny,nz)
+    :param By: By array shape like (nx,ny,nz)
+    :param Bz: Bz array shape like (nx,ny,nz)
+    :param mask: lower boundary mask shape like (nx,ny)
+    :param tile: interior planes per slab
+    :return: (num, wsum) same as cwsin_kernel on the whole field
+    """
+    nx = Bx.shape[0]
+    num = 0.0
+    wsum = 0.0
+    for i0 in range(1, nx - 1, tile):
+        sl = slice(i0 - 1, min(i0 + tile, nx - 1) + 1)
+        n, w = cwsin_kernel(Bx[sl], By[sl], Bz[sl], mask[sl])
+        num += n
+        wsum += w
+    return num, wsum
+
+
+if cuda is not None:
+    @cuda.jit(device=True)
+    def _load_tile(F, sf, i, j, k, nx, ny, nz):
+        """
+        copy F[i,j,k] and the face halo this thread is responsible for into the shared tile sf
+        """
+        tx = cuda.threadIdx.x
+        ty = cuda.threadIdx.y
+        tz = cuda.threadIdx.z
+        sf[tx + 1, ty + 1, tz + 1] = F[i, j, k]
+        if tx == 0:
+            sf[0, ty + 1, tz + 1] = F[i - 1, j, k]
+        if tx == GPU_BLOCK - 1 or i == nx - 2:
+            sf[tx + 2, ty + 1, tz + 1] = F[i + 1, j, k]
+        if ty == 0:
+            sf[tx + 1, 0, tz + 1] = F[i, j - 1, k]
+        if ty == GPU_BLOCK - 1 or j == ny - 2:
+            sf[tx + 1, ty + 2, tz + 1] = F[i, j + 1, k]
+        if tz == 0:
+            sf[tx + 1, ty + 1, 0] = F[i, j, k - 1]
+        if tz == GPU_BLOCK - 1 or k == nz - 2:
+            sf[tx + 1, ty + 1, tz + 2] = F[i, j, k + 1]
+
+    @cuda.jit  # no fastmath, it lets a NaN voxel drop out of the sums
+    def cwsin_gpu(Bx, By, Bz, mask, out):
+        """
+        cuda version of cwsin_kernel, block (GPU_BLOCK,)*3 covers a tile of interior voxels
+        neighbour loads come from shared memory tiles, each block adds its partial sums to out
+        :param Bx: device array shape like (nx,ny,nz)
+        :param By: device array shape like (nx,ny,nz)
+        :param Bz: device array shape like (nx,ny,nz)
+        :param mask: device array shape like (nx,ny)
+        :param out: device array shape (2,) zeroed, out[0] += num, out[1] += wsum
+        """
+        sx = cuda.shared.array((GPU_BLOCK + 2, GPU_BLOCK + 2, GPU_BLOCK + 2), float64)
+        sy = cuda.shared.array((GPU_BLOCK + 2, GPU_BLOCK + 2, GPU_BLOCK + 2), float64)
+        sz = cuda.shared.array((GPU_BLOCK + 2, GPU_BLOCK + 2, GPU_BLOCK + 2), float64)
+        snum = cuda.shared.array(GPU_BLOCK * GPU_BLOCK * GPU_BLOCK, float64)
+        swsum = cuda.shared.array(GPU_BLOCK * GPU_BLOCK * GPU_BLOCK, float64)
+
+        nx, ny, nz = Bx.shape
+        tx = cuda.threadIdx.x
+        ty = cuda.threadIdx.y
+        tz = cuda.threadIdx.z
+        t = (tx * GPU_BLOCK + ty) * GPU_BLOCK + tz
+        i = 1 + cuda.blockIdx.x * GPU_BLOCK + tx
+        j = 1 + cuda.blockIdx.y * GPU_BLOCK + ty
+        k = 1 + cuda.blockIdx.z * GPU_BLOCK + tz
+        inside = i < nx - 1 and j < ny - 1 and k < nz - 1
+
+        if inside:
+            _load_tile(Bx, sx, i, j, k, nx, ny, nz)
+            _load_tile(By, sy, i, j, k, nx, ny, nz)
+            _load_tile(Bz, sz, i, j, k, nx, ny, nz)
+        cuda.syncthreads()
+
+        num = 0.0
+        wsum = 0.0
+        # masked columns still load their tile above, neighbours may need it
+        if inside and mask[i, j] != 0.0:
+            a = tx + 1
+            b = ty + 1
+            c = tz + 1
+            jx = (sz[a, b + 1, c] - sz[a, b - 1, c]) - (sy[a, b, c + 1] - sy[a, b, c - 1])
+            jy = (sx[a, b, c + 1] - sx[a, b, c - 1]) - (sz[a + 1, b, c] - sz[a - 1, b, c])
+            jz = (sy[a + 1, b, c] - sy[a - 1, b, c]) - (sx[a, b + 1, c] - sx[a, b - 1, c])
+            bx = sx[a, b, c]
+            by = sy[a, b, c]
+            bz = sz[a, b, c]
+            b2 = bx * bx + by * by + bz * bz
+            j2 = jx * jx + jy * jy + jz * jz
+            cx = jy * bz - jz * by
+            cy = jz * bx - jx * bz
+            cz = jx * by - jy * bx
+            wsum = math.sqrt(j2 * b2)
+            num = math.sqrt(cx * cx + cy * cy + cz * cz)
+        snum[t] = num
+        swsum[t] = wsum
+        cuda.syncthreads()
+
+        # tree reduction in shared memory, then one atomic per block
+        step = GPU_BLOCK * GPU_BLOCK * GPU_BLOCK // 2
+        while step > 0:
+            if t < step:
+                snum[t] += snum[t + step]
+                swsum[t] += swsum[t + step]
+            cuda.syncthreads()
+            step //= 2
+        if t == 0:
+            cuda.atomic.add(out, 0, snum[0])
+            cuda.atomic.add(out, 1, swsum[0])
+
+
+def gpu_available():
+    """
+    :return: True if cwsin_gpu can run here
+    """
+    return cuda is not None and cuda.is_available()
+
+
+def field_cwsin_gpu(Bx, By, Bz, mask):
+    """
+    copy Bx,By,Bz to the device once and run cwsin_gpu over all interior voxels
+    :param Bx: Bx array shape like (nx,ny,nz)
+    :param By: By array shape like (nx,ny,nz)
+    :param Bz: Bz array shape like (nx,ny,nz)
+    :param mask: lower boundary mask shape like (nx,ny)
+    :return: (num, wsum) same as field_cwsin
+    """
+    nx, ny, nz = Bx.shape
+    if min(nx, ny, nz) < 3:
+        return 0.0, 0.0
+    out = cuda.to_device(np.zeros(2, dtype=np.float64))
+    blocks = tuple((n - 2 + GPU_BLOCK - 1) // GPU_BLOCK for n in (nx, ny, nz))
+    cwsin_gpu[blocks, (GPU_BLOCK, GPU_BLOCK, GPU_BLOCK)](
+        cuda.to_device(Bx), cuda.to_device(By), cuda.to_device(Bz),
+        cuda.to_device(mask), out)
+    num, wsum = out.copy_to_host()
+    return float(num), float(wsum)
+
+
+def read_mask(mask_path, nx, ny):
+    """
+    read the lower boundary mask written by PrepareWorker, one value per line
+    relax1.c reads it with x changing fastest, so mask[ix,iy] is line iy*nx+ix
+    :param mask_path: the path of mask3.dat, or its os.DirEntry from os.scandir
+    :param nx: nx size
+    :param ny: ny size
+    :return: numpy array shape like (nx,ny), or None if missing or size not agree
+    """
+    try:
+        values = np.loadtxt(mask_path, dtype=np.float64).ravel()
+    except FileNotFoundError:
+        return None
+    if values.size != nx * ny:
+        print(f"Warning: {os.fspath(mask_path)} has {values.size} values, expected {nx*ny}, mask not used")
+        return None
+    return np.ascontiguousarray(values.reshape((ny, nx)).T)
+
+
+def split_components(B):
+    """
+    split B shape like (3,nx,ny,nz) into C contiguous Bx, By, Bz planes for the kernels
+    bin files are written Bx then By then Bz, so for read_bin this is a view, not a copy
+    :param B: numpy array shape like (3,nx,ny,nz)
+    :return: (Bx, By, Bz) each shape like (nx,ny,nz)
+    """
+    return (np.ascontiguousarray(B[0]),
+            np.ascontiguousarray(B[1]),
+            np.ascontiguousarray(B[2]))
+
+
+def analyze_field(project_dir, force_recompute=False):
+    """Analyze NLFFF results from a project directory.
+
+    The J∥B angle is taken from NLFFFquality3.log when present,
+    force_recompute=True estimates it from Bout.bin instead.
+    """
     
     print("="*70)
     print("NLFFF Results Analysis")
     print("="*70)
     print(f"Project: {project_dir}\n")
     
-    # Check which files exist
-    has_b0 = os.path.exists(os.path.join(project_dir, "B0.bin"))
-    has_bout = os.path.exists(os.path.join(project_dir, "Bout.bin"))
-    has_grid3 = os.path.exists(os.path.join(project_dir, "grid3.ini"))
+    # Check which files exist, one directory read for all of them
+    entries = {e.name: e for e in os.scandir(project_dir)}
+    has_b0 = "B0.bin" in entries
+    has_bout = "Bout.bin" in entries
+    has_grid3 = "grid3.ini" in entries
     
     if not has_grid3:
         print("Error: grid3.ini not found!")
@@ -73,19 +538,23 @@ def analyze_field(project_dir):
             memmap=True
         )
         
-        Bx0, By0, Bz0 = B0[0], B0[1], B0[2]
-        B0_mag = np.sqrt(Bx0**2 + By0**2 + Bz0**2)
+        Bx0, By0, Bz0 = split_components(B0)
+        (x0_min, x0_max, y0_min, y0_max, z0_min, z0_max,
+         b0_min, b0_max, b0_mean, energy0) = field_stats(Bx0, By0, Bz0)
         
-        print(f"Bx range: [{Bx0.min():8.2f}, {Bx0.max():8.2f}] G")
-        print(f"By range: [{By0.min():8.2f}, {By0.max():8.2f}] G")
-        print(f"Bz range: [{Bz0.min():8.2f}, {Bz0.max():8.2f}] G")
-        print(f"|B| range: [{B0_mag.min():8.2f}, {B0_mag.max():8.2f}] G")
-        print(f"|B| mean:  {B0_mag.mean():8.2f} G")
+        print(f"Bx range: [{x0_min:8.2f}, {x0_max:8.2f}] G")
+        print(f"By range: [{y0_min:8.2f}, {y0_max:8.2f}] G")
+        print(f"Bz range: [{z0_min:8.2f}, {z0_max:8.2f}] G")
+        print(f"|B| range: [{b0_min:8.2f}, {b0_max:8.2f}] G")
+        print(f"|B| mean:  {b0_mean:8.2f} G")
         
         # Energy (assuming unit spacing, result in arbitrary units)
-        energy0 = np.sum(B0_mag**2)
         print(f"Energy (integrated |B|²): {energy0:.3e}")
         print()
+        
+        # B0.bin is not read again, unmap it and let its page cache go
+        del B0, Bx0, By0, Bz0
+        reader.release_bin_cache(entries["B0.bin"])
     
     # Analyze NLFFF field if exists
     if has_bout:
@@ -99,21 +568,23 @@ def analyze_field(project_dir):
             memmap=True
         )
         
-        Bx, By, Bz = B[0], B[1], B[2]
-        B_mag = np.sqrt(Bx**2 + By**2 + Bz**2)
+        Bx, By, Bz = split_components(B)
+        (x_min, x_max, y_min, y_max, z_min, z_max,
+         b_min, b_max, b_mean, energy) = field_stats(Bx, By, Bz)
         
-        print(f"Bx range: [{Bx.min():8.2f}, {Bx.max():8.2f}] G")
-        print(f"By range: [{By.min():8.2f}, {By.max():8.2f}] G")
-        print(f"Bz range: [{Bz.min():8.2f}, {Bz.max():8.2f}] G")
-        print(f"|B| range: [{B_mag.min():8.2f}, {B_mag.max():8.2f}] G")
-        print(f"|B| mean:  {B_mag.mean():8.2f} G")
+        print(f"Bx range: [{x_min:8.2f}, {x_max:8.2f}] G")
+        print(f"By range: [{y_min:8.2f}, {y_max:8.2f}] G")
+        print(f"Bz range: [{z_min:8.2f}, {z_max:8.2f}] G")
+        print(f"|B| range: [{b_min:8.2f}, {b_max:8.2f}] G")
+        print(f"|B| mean:  {b_mean:8.2f} G")
         
         # Energy
-        energy = np.sum(B_mag**2)
         print(f"Energy (integrated |B|²): {energy:.3e}")
         
         if has_b0:
-            ratio = energy / energy0
+            # field_stats returns python floats, divide as np.float64 so an all zero B0.bin
+            # prints inf (or nan) with a RuntimeWarning instead of raising ZeroDivisionError
+            ratio = np.float64(energy) / energy0
             print(f"Energy ratio (NLFFF/Potential): {ratio:.4f}")
         print()
         
@@ -122,30 +593,47 @@ def analyze_field(project_dir):
         print("Force-Free Diagnostics")
         print("-" * 70)
         
-        # Current-weighted sine (simplified, full calculation needs proper derivatives)
-        # This is a very rough estimate
-        eps = 1e-10
-        jx = (Bz[1:-1, 2:, 1:-1] - Bz[1:-1, :-2, 1:-1]) - (By[1:-1, 1:-1, 2:] - By[1:-1, 1:-1, :-2])
-        jy = (Bx[1:-1, 1:-1, 2:] - Bx[1:-1, 1:-1, :-2]) - (Bz[2:, 1:-1, 1:-1] - Bz[:-2, 1:-1, 1:-1])
-        jz = (By[2:, 1:-1, 1:-1] - By[:-2, 1:-1, 1:-1]) - (Bx[1:-1, 2:, 1:-1] - Bx[1:-1, :-2, 1:-1])
-        
-        j_mag = np.sqrt(jx**2 + jy**2 + jz**2) + eps
-        bx_c = Bx[1:-1, 1:-1, 1:-1]
-        by_c = By[1:-1, 1:-1, 1:-1]
-        bz_c = Bz[1:-1, 1:-1, 1:-1]
-        b_mag_c = np.sqrt(bx_c**2 + by_c**2 + bz_c**2) + eps
-        
-        cos_angle = (jx*bx_c + jy*by_c + jz*bz_c) / (j_mag * b_mag_c)
-        angle = np.arccos(np.clip(cos_angle, -1, 1)) * 180 / np.pi
+        # The solver's checkquality already logs Sigma_J and Angle(B,J) with proper
+        # derivatives, use that unless asked to recompute
+        logged = None
+        if not force_recompute and "NLFFFquality3.log" in entries:
+            logged = read_quality_sigma(entries["NLFFFquality3.log"])
+        if logged:
+            # the logged value covers the full box, mask3.dat is not applied to it, so it is
+            # not the same measurement as the masked --force-recompute estimate
+            sigma_j, angle = logged[0]
+            print(f"Current-weighted angle (J∥B): {angle:.2f}° "
+                  f"(NLFFFquality3.log, full box, not masked, Sigma_J={sigma_j:.4f})")
+            print("  (< 10° is good, < 5° is excellent)")
+            print("  (--force-recompute estimates it from Bout.bin, skipping mask3.dat == 0 columns)")
+            print()
+        else:
+            # Current-weighted sine (simplified, full calculation needs proper derivatives)
+            # This is a very rough estimate
+            mask = None
+            if "mask3.dat" in entries:
+                mask = read_mask(entries["mask3.dat"], nx, ny)
+            if mask is None:
+                mask = np.ones((nx, ny), dtype=np.float64)
+            else:
+                print(f"Skipping {np.count_nonzero(mask == 0.0):,} of {nx*ny:,} columns with mask3.dat == 0")
+            if gpu_available():
+                num, wsum = field_cwsin_gpu(Bx, By, Bz, mask)
+            else:
+                num, wsum = field_cwsin(Bx, By, Bz, mask)
+            # a NaN/inf voxel (diverged run) or no current at all must not read as 0°
+            cwsin = num / wsum if wsum > 0 else float('nan')
+            if math.isfinite(cwsin):
+                cwsin_deg = math.degrees(math.asin(min(1.0, cwsin)))
+            else:
+                cwsin_deg = float('nan')
+            
+            print(f"Current-weighted angle (J∥B): {cwsin_deg:.2f}° (estimate)")
+            print("  (< 10° is good, < 5° is excellent)")
+            print()
         
-        # Current-weighted average
-        weight = j_mag * b_mag_c
-        cwsin = np.sum(np.sin(angle * np.pi/180) * weight) / np.sum(weight)
-        cwsin_deg = np.arcsin(cwsin) * 180 / np.pi
-        
-        print(f"Current-weighted angle (J∥B): {cwsin_deg:.2f}° (estimate)")
-        print("  (< 10° is good, < 5° is excellent)")
-        print()
+        del B, Bx, By, Bz
+        reader.release_bin_cache(entries["Bout.bin"])
     
     # Read quality logs
     print("-" * 70)
@@ -153,16 +641,14 @@ def analyze_field(project_dir):
     print("-" * 70)
     
     for level in [1, 2, 3]:
-        logfile = os.path.join(project_dir, f"NLFFFquality{level}.log")
-        if os.path.exists(logfile):
+        logname = f"NLFFFquality{level}.log"
+        if logname in entries:
             print(f"\nGrid Level {level}:")
-            metrics = read_quality_log(logfile)
+            metrics = read_quality_log(entries[logname])
             if metrics:
-                for key, val in metrics.items():
-                    if isinstance(val, float):
-                        print(f"  {key:20s}: {val:.6f}")
-                    else:
-                        print(f"  {key:20s}: {val}")
+                print("\n".join(
+                    f"  {key:20s}: {val:.6f}" if isinstance(val, float) else f"  {key:20s}: {val}"
+                    for key, val in metrics.items()))
     
     print()
     print("="*70)
@@ -171,17 +657,21 @@ def analyze_field(project_dir):
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python read_results_example.py /path/to/project_dir")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Read and analyze NLFFF results from a project directory.")
+    parser.add_argument("project_dir",
+                       help="Project directory with grid3.ini, B0.bin, Bout.bin, NLFFFquality*.log")
+    parser.add_argument("--force-recompute", action="store_true",
+                       help="Estimate the J∥B angle from Bout.bin even if NLFFFquality3.log has it")
+    args = parser.parse_args()
     
-    project_dir = sys.argv[1]
+    project_dir = args.project_dir
     
     if not os.path.isdir(project_dir):
         print(f"Error: Directory not found: {project_dir}")
         sys.exit(1)
     
-    analyze_field(project_dir)
+    analyze_field(project_dir, force_recompute=args.force_recompute)
 
 
 if __name__ == "__main__":